@@ -1,7 +1,9 @@
 #!/usr/bin/env python
+from __future__ import annotations
+import concurrent.futures
 import elasticapm
 import os
-import tempfile
+from collections import defaultdict
 
 from assemblyline.common import forge
 from assemblyline.common.archiving import ARCHIVE_QUEUE_NAME
@@ -15,6 +17,16 @@ from assemblyline.remote.datatypes.queues.named import NamedQueue
 from assemblyline_core.server_base import ServerBase
 
 
+# Number of files and results of a submission being archived at the same time
+ARCHIVE_THREADS = int(os.environ.get('ARCHIVE_THREADS', '16'))
+
+# Number of file contents being copied to the archivestore at the same time, each copy holds the whole file in memory
+ARCHIVE_COPY_THREADS = int(os.environ.get('ARCHIVE_COPY_THREADS', '2'))
+
+# How long to block on the archive queue while idle, kept under the shutdown timeout so stopping stays responsive
+ARCHIVE_POP_TIMEOUT = 5
+
+
 class SubmissionNotFound(Exception):
     pass
 
@@ -38,6 +50,9 @@ class Archiver(ServerBase):
             )
 
             self.archive_queue: NamedQueue[dict] = NamedQueue(ARCHIVE_QUEUE_NAME, self.persistent_redis)
+            self.pool = concurrent.futures.ThreadPoolExecutor(ARCHIVE_THREADS, thread_name_prefix='archiver')
+            self.copy_pool = concurrent.futures.ThreadPoolExecutor(ARCHIVE_COPY_THREADS,
+                                                                   thread_name_prefix='archiver-copy')
             if self.config.core.metrics.apm_server.server_url is not None:
                 self.log.info(f"Exporting application metrics to: {self.config.core.metrics.apm_server.server_url}")
                 elasticapm.instrument()
@@ -54,8 +69,61 @@ class Archiver(ServerBase):
             elasticapm.uninstrument()
         super().stop()
 
+    def _archive_file(self, sha256: str, supplementary: bool, result_keys: list[str], delete_after: bool):
+        # Get the tags for this file
+        tags = self.datastore.get_tag_list_from_keys(result_keys)
+        attributions = {x['value'] for x in tags if x['type'].startswith('attribution.')}
+        techniques = {x['type'].rsplit('.', 1)[1] for x in tags if x['type'].startswith('technique.')}
+        infos = {'ioc' for x in tags if x['type'] in self.config.submission.tag_types.ioc}
+        infos = infos.union({'password' for x in tags if x['type'] == 'info.password'})
+
+        # Create the archive file
+        self.datastore.file.archive(sha256, delete_after=delete_after, allow_missing=True)
+
+        # Auto-Labelling
+        operations = []
+
+        # Create default labels
+        operations += [(self.datastore.file.UPDATE_APPEND_IF_MISSING, 'labels', x) for x in attributions]
+        operations += [(self.datastore.file.UPDATE_APPEND_IF_MISSING, 'labels', x) for x in techniques]
+        operations += [(self.datastore.file.UPDATE_APPEND_IF_MISSING, 'labels', x) for x in infos]
+
+        # Create type specific labels
+        operations += [
+            (self.datastore.file.UPDATE_APPEND_IF_MISSING, 'label_categories.attribution', x)
+            for x in attributions]
+        operations += [
+            (self.datastore.file.UPDATE_APPEND_IF_MISSING, 'label_categories.technique', x)
+            for x in techniques]
+        operations += [
+            (self.datastore.file.UPDATE_APPEND_IF_MISSING, 'label_categories.info', x)
+            for x in infos]
+
+        # Set the is_supplementary property
+        operations += [(self.datastore.file.UPDATE_SET, 'is_supplementary', supplementary)]
+
+        # Apply auto-created labels
+        self.datastore.file.update(sha256, operations=operations, index_type=Index.ARCHIVE)
+        self.datastore.file.update(sha256, operations=operations, index_type=Index.HOT)
+
+    def _copy_file(self, sha256: str):
+        # Copy the file through memory rather than bouncing it off the disk
+        try:
+            # Content that already reached the archivestore doesn't need to be downloaded again
+            if self.archivestore.exists(sha256):
+                return
+
+            content = self.filestore.get(sha256)
+            if content is None:
+                self.log.error(f"Could not copy file {sha256} from the filestore to the archivestore. "
+                               "(File not found in the filestore)")
+            elif content:
+                self.archivestore.put(sha256, content)
+        except Exception as e:
+            self.log.error(f"Could not copy file {sha256} from the filestore to the archivestore. ({e})")
+
     def run_once(self):
-        message = self.archive_queue.pop(timeout=1)
+        message = self.archive_queue.pop(timeout=ARCHIVE_POP_TIMEOUT)
 
         # If there is no alert bail out
         if not message:
@@ -85,64 +153,38 @@ class Archiver(ServerBase):
                     self.datastore.submission.update(type_id, [(ESCollection.UPDATE_SET, 'archived', True)],
                                                      index_type=Index.HOT)
 
-                # Gather list of files and archives them
-                files = {(f.sha256, False) for f in submission.files}
-                files.update(self.datastore.get_file_list_from_keys(submission.results))
-                for sha256, supplementary in files:
-                    self.counter.increment('file')
+                # Gather list of files and archives them, a file is only supplementary if it is nothing else
+                files: dict[str, bool] = {f.sha256: False for f in submission.files}
+                if submission.results:
+                    for sha256, supplementary in self.datastore.get_file_list_from_keys(submission.results):
+                        files[sha256] = files.get(sha256, True) and supplementary
 
-                    # Get the tags for this file
-                    tags = self.datastore.get_tag_list_from_keys(
-                        [r for r in submission.results if r.startswith(sha256)])
-                    attributions = {x['value'] for x in tags if x['type'].startswith('attribution.')}
-                    techniques = {x['type'].rsplit('.', 1)[1] for x in tags if x['type'].startswith('technique.')}
-                    infos = {'ioc' for x in tags if x['type'] in self.config.submission.tag_types.ioc}
-                    infos = infos.union({'password' for x in tags if x['type'] == 'info.password'})
-
-                    # Create the archive file
-                    self.datastore.file.archive(sha256, delete_after=delete_after, allow_missing=True)
-
-                    # Auto-Labelling
-                    operations = []
-
-                    # Create default labels
-                    operations += [(self.datastore.file.UPDATE_APPEND_IF_MISSING, 'labels', x) for x in attributions]
-                    operations += [(self.datastore.file.UPDATE_APPEND_IF_MISSING, 'labels', x) for x in techniques]
-                    operations += [(self.datastore.file.UPDATE_APPEND_IF_MISSING, 'labels', x) for x in infos]
-
-                    # Create type specific labels
-                    operations += [
-                        (self.datastore.file.UPDATE_APPEND_IF_MISSING, 'label_categories.attribution', x)
-                        for x in attributions]
-                    operations += [
-                        (self.datastore.file.UPDATE_APPEND_IF_MISSING, 'label_categories.technique', x)
-                        for x in techniques]
-                    operations += [
-                        (self.datastore.file.UPDATE_APPEND_IF_MISSING, 'label_categories.info', x)
-                        for x in infos]
-
-                    # Set the is_supplementary property
-                    operations += [(self.datastore.file.UPDATE_SET, 'is_supplementary', supplementary)]
-
-                    # Apply auto-created labels
-                    self.datastore.file.update(sha256, operations=operations, index_type=Index.ARCHIVE)
-                    self.datastore.file.update(sha256, operations=operations, index_type=Index.HOT)
+                # Group the result keys by file once, rather than having every file scan all of them
+                file_results: dict[str, list[str]] = defaultdict(list)
+                for r in submission.results:
+                    file_results[r.split('.', 1)[0]].append(r)
 
+                futures = []
+                for sha256, supplementary in files.items():
+                    self.counter.increment('file')
+                    futures.append(self.pool.submit(self._archive_file, sha256, supplementary,
+                                                    file_results.get(sha256, []), delete_after))
+
+                    # File contents go through their own small pool to bound memory use
                     if self.filestore != self.archivestore:
-                        with tempfile.NamedTemporaryFile() as buf:
-                            try:
-                                self.filestore.download(sha256, buf.name)
-                                if os.path.getsize(buf.name):
-                                    self.archivestore.upload(buf.name, sha256)
-                            except Exception as e:
-                                self.log.error(
-                                    f"Could not copy file {sha256} from the filestore to the archivestore. ({e})")
+                        futures.append(self.copy_pool.submit(self._copy_file, sha256))
 
                 # Archive associated results (Skip emptys)
                 for r in submission.results:
                     if not r.endswith(".e"):
                         self.counter.increment('result')
-                        self.datastore.result.archive(r, delete_after=delete_after, allow_missing=True)
+                        futures.append(self.pool.submit(self.datastore.result.archive, r,
+                                                        delete_after=delete_after, allow_missing=True))
+
+                # Wait for all of it to be done, then surface any failure the same way as if it was raised inline
+                concurrent.futures.wait(futures)
+                for future in futures:
+                    future.result()
 
                 # End of process alert transaction (success)
                 self.log.info(f"Successfully archived submission '{type_id}'.")
@@ -173,9 +215,14 @@ class Archiver(ServerBase):
                 self.apm_client.end_transaction(archive_type, 'exception')
 
     def try_run(self):
-        while self.running:
-            self.heartbeat()
-            self.run_once()
+        try:
+            while self.running:
+                self.heartbeat()
+                self.run_once()
+        finally:
+            # Only shut the pools down once this thread is done submitting to them
+            self.pool.shutdown()
+            self.copy_pool.shutdown()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Dict, Optional, Set, cast
+from typing import Dict, NamedTuple, Optional, Pattern, Set, Tuple, cast
 
 import logging
 import os
@@ -18,6 +18,40 @@ from assemblyline_core.server_base import get_service_stage_hash, ServiceStage
 SKIP_SERVICE_SETUP = os.environ.get('SKIP_SERVICE_SETUP', 'false').lower() in ['true', '1']
 
 Classification = get_classification()
+logger = logging.getLogger('assemblyline.dispatching.scheduler')
+
+# Accept patterns that match every file type, services using them can skip the regex entirely
+ACCEPT_ALL_PATTERNS = {'.*', '^.*', '.*$', '^.*$'}
+
+# Compiled accepts/rejects filters of a service, None means the filter doesn't need to be tested
+ServiceFilters = Tuple[Optional[Pattern], Optional[Pattern]]
+
+
+def compile_service_filters(service: Service) -> ServiceFilters:
+    """Compile the accepts and rejects patterns of a service once so scheduling doesn't pay for it."""
+    accepts = None
+    if service.accepts and service.accepts not in ACCEPT_ALL_PATTERNS:
+        accepts = re.compile(service.accepts)
+    rejects = re.compile(service.rejects) if service.rejects else None
+    return accepts, rejects
+
+
+class ServiceTables(NamedTuple):
+    """The enabled services along with the tables derived from them, so they are always refreshed together."""
+    services: Dict[str, Service]
+    categories: Dict[str, list[str]]
+    filters: Dict[str, ServiceFilters]
+
+
+def build_service_tables(services: Dict[str, Service]) -> ServiceTables:
+    categories: dict[str, list[str]] = {}
+    for service in services.values():
+        try:
+            categories[service.category].append(service.name)
+        except KeyError:
+            categories[service.category] = [service.name]
+    filters = {name: compile_service_filters(service) for name, service in services.items()}
+    return ServiceTables(services, categories, filters)
 
 
 class Scheduler:
@@ -27,7 +61,8 @@ class Scheduler:
         self.datastore = datastore
         self.config = config
         self._services: Dict[str, Service] = {}
-        self.services = cast(Dict[str, Service], CachedObject(self._get_services))
+        self._stage_index: Dict[str, int] = {stage: index for index, stage in enumerate(config.services.stages)}
+        self._tables = cast(ServiceTables, CachedObject(self._get_services))
         self.service_stage = get_service_stage_hash(redis)
         self.c12n_services: Dict[str, Set[str]] = {}
 
@@ -35,7 +70,8 @@ class Scheduler:
                        runtime_excluded: Optional[list[str]] = None,
                        submitter_c12n: Optional[str] = Classification.UNRESTRICTED) -> list[dict[str, Service]]:
         # Get the set of all services currently enabled on the system
-        all_services = dict(self.services)
+        tables = self.service_tables()
+        all_services = tables.services
 
         # Retrieve a list of services that the classfication group is allowed to submit to
         if submitter_c12n is None:
@@ -65,27 +101,29 @@ class Scheduler:
             selected.remove("Safelist")
 
         # Add all selected, accepted, and not rejected services to the schedule
-        schedule: list[dict[str, Service]] = [{} for _ in self.config.services.stages]
-        services = list(set(selected).intersection(accessible) - set(excluded) - set(runtime_excluded))
-        selected = []
-        skipped = []
-        for name in services:
-            service = all_services.get(name, None)
+        schedule: list[dict[str, Service]] = [{} for _ in self._stage_index]
+        candidates = set(selected).intersection(accessible) - set(excluded) - set(runtime_excluded)
+        skipped = list(candidates - all_services.keys())
+        for name in skipped:
+            logger.warning(f"Service configuration not found: {name}")
 
-            if not service:
-                skipped.append(name)
-                logging.warning(f"Service configuration not found: {name}")
-                continue
-
-            accepted = not service.accepts or re.match(service.accepts, file_type)
-            rejected = bool(service.rejects) and re.match(service.rejects, file_type)
+        selected = []
+        service_filters = tables.filters
+        for name in candidates & all_services.keys():
+            service = all_services[name]
+            accepts, rejects = service_filters.get(name) or compile_service_filters(service)
+            accepted = accepts is None or accepts.match(file_type)
+            rejected = rejects is not None and rejects.match(file_type)
 
             if accepted and not rejected:
-                schedule[self.stage_index(service.stage)][name] = service
+                schedule[self._stage_index[service.stage]][name] = service
                 selected.append(name)
             else:
                 skipped.append(name)
 
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Schedule for {file_type}: selected {sorted(selected)}, skipped {sorted(skipped)}")
+
         return schedule
 
     def expand_categories(self, services: list[str]) -> list[str]:
@@ -100,7 +138,7 @@ class Scheduler:
         services = list(services)
         categories = self.categories()
 
-        found_services = []
+        found_services: set[str] = set()
         seen_categories: set[str] = set()
         while services:
             name = services.pop()
@@ -112,23 +150,28 @@ class Scheduler:
                     # things that we need to evaluate, and mark this
                     # group as having been seen.
                     services.extend(categories[name])
-                    seen_categories.update(name)
+                    seen_categories.add(name)
                 continue
 
             # If it isn't a category, its a service
-            found_services.append(name)
+            found_services.add(name)
+
+        return list(found_services)
 
-        # Use set to remove duplicates, set is more efficient in batches
-        return list(set(found_services))
+    @property
+    def services(self) -> Dict[str, Service]:
+        return self._tables.services
+
+    def service_tables(self) -> ServiceTables:
+        tables = getattr(self, '_tables', None)
+        if tables is None:
+            # Schedulers that provide their own services don't have the cached tables
+            return build_service_tables(self.services)
+        # Each attribute read goes through the cache, which reloads the tables once they are stale
+        return ServiceTables(tables.services, tables.categories, tables.filters)
 
     def categories(self) -> Dict[str, list[str]]:
-        all_categories: dict[str, list[str]] = {}
-        for service in self.services.values():
-            try:
-                all_categories[service.category].append(service.name)
-            except KeyError:
-                all_categories[service.category] = [service.name]
-        return all_categories
+        return self.service_tables().categories
 
     def get_accessible_services(self, user_c12n: str) -> Set[str]:
         if not self.c12n_services.get(user_c12n):
@@ -139,9 +182,12 @@ class Scheduler:
         return self.c12n_services[user_c12n]
 
     def stage_index(self, stage):
-        return self.config.services.stages.index(stage)
+        try:
+            return self._stage_index[stage]
+        except AttributeError:
+            return self.config.services.stages.index(stage)
 
-    def _get_services(self):
+    def _get_services(self) -> ServiceTables:
         old, self._services = self._services, {}
         stages = self.service_stage.items()
         services: list[Service] = self.datastore.list_all_services(full=True)
@@ -157,4 +203,5 @@ class Scheduler:
                         self._services[service.name] = service
                 else:
                     self._services[service.name] = service
-        return self._services
+
+        return build_service_tables(self._services)
@@ -23,16 +23,28 @@ from assemblyline.remote.datatypes.set import Set
 if TYPE_CHECKING:
     from assemblyline.datastore.collection import ESCollection
 
+# Number of threads each filestore delete worker spreads its batch over
+FILE_DELETE_THREADS = 8
+
+# Files handed to a delete thread at a time, small enough that idle threads can pick up the remaining work
+FILE_DELETE_CHUNK_SIZE = 16
+
 
 def file_delete_worker(logger, filestore_urls, file_batch) -> list[str]:
     try:
         filestore = FileStore(*filestore_urls)
 
-        def filestore_delete(sha256: str) -> Optional[str]:
-            filestore.delete(sha256)
-            if not filestore.exists(sha256):
-                return sha256
-            return None
+        def filestore_delete(sha256_chunk: list[str]) -> list[str]:
+            erased: list[str] = []
+            for sha256 in sha256_chunk:
+                # A failure on one file shouldn't cost us the rest of the chunk
+                try:
+                    filestore.delete(sha256)
+                    if not filestore.exists(sha256):
+                        erased.append(sha256)
+                except Exception as error:
+                    logger.exception(f"Error deleting {sha256} from the filestore: " + str(error))
+            return erased
 
         return _file_delete_worker(logger, filestore_delete, file_batch)
 
@@ -41,20 +53,18 @@ def file_delete_worker(logger, filestore_urls, file_batch) -> list[str]:
     return []
 
 
-def _file_delete_worker(logger, delete_action: Callable[[str], Optional[str]], file_batch) -> list[str]:
+def _file_delete_worker(logger, delete_action: Callable[[list[str]], list[str]], file_batch) -> list[str]:
     finished_files: list[str] = []
     try:
         futures = []
 
-        with ThreadPoolExecutor(8) as pool:
-            for filename in file_batch:
-                futures.append(pool.submit(delete_action, filename))
+        with ThreadPoolExecutor(FILE_DELETE_THREADS) as pool:
+            for index in range(0, len(file_batch), FILE_DELETE_CHUNK_SIZE):
+                futures.append(pool.submit(delete_action, file_batch[index:index + FILE_DELETE_CHUNK_SIZE]))
 
             for future in as_completed(futures):
                 try:
-                    erased_name = future.result()
-                    if erased_name:
-                        finished_files.append(erased_name)
+                    finished_files.extend(future.result())
                 except Exception as error:
                     logger.exception("Error in filestore worker: " + str(error))
 
@@ -77,6 +87,11 @@ class ExpiryManager(ServerBase):
         self.same_storage = self.config.filestore.storage == self.config.filestore.archive
         self.current_submission_cleanup = set()
 
+        # Datemath for the end of the expiry window, it only depends on the current time
+        self.final_date_template = f"{{now}}||-{self.config.core.expiry.delay}h"
+        if self.config.core.expiry.batch_delete:
+            self.final_date_template += "/d"
+
         self.redis_persist = redis_persist or get_client(
             host=self.config.core.redis.persistent.host,
             port=self.config.core.redis.persistent.port,
@@ -84,9 +99,9 @@ class ExpiryManager(ServerBase):
         )
         self.redis_bad_sids = Set(BAD_SID_HASH, host=self.redis_persist)
 
-        self.fs_hashmap = {
-            'file': self.filestore_delete,
-            'cached_file': self.cachestore_delete
+        self.fs_urls = {
+            'file': list(self.config.filestore.storage),
+            'cached_file': list(self.config.filestore.cache)
         }
 
         for name, definition in self.datastore.ds.get_models().items():
@@ -121,20 +136,14 @@ class ExpiryManager(ServerBase):
                 self.log.exception("Error in expiry worker")
         return _func
 
-    def filestore_delete(self, file_batch, _):
+    def storage_delete(self, filestore_urls: list[str], file_batch: list[str]) -> Future:
         return self.file_delete_worker.submit(file_delete_worker, logger=self.log,
-                                              filestore_urls=list(self.config.filestore.storage),
-                                              file_batch=file_batch)
+                                              filestore_urls=filestore_urls, file_batch=file_batch)
 
-    def cachestore_delete(self, file_batch, _):
-        return self.file_delete_worker.submit(file_delete_worker, logger=self.log,
-                                              filestore_urls=list(self.config.filestore.cache),
-                                              file_batch=file_batch)
-
-    def _finish_delete(self, collection: ESCollection, task: Future, expire_only: list[str]):
+    def _finish_delete(self, collection: ESCollection, task: Optional[Future], expire_only: list[str]):
         # Wait until the worker process finishes deleting files
         file_list: list[str] = []
-        while self.running:
+        while task is not None and self.running:
             self.heartbeat()
             try:
                 file_list = task.result(5)
@@ -182,7 +191,16 @@ class ExpiryManager(ServerBase):
             self.apm_client.end_transaction("canceled_submissions", 'deleted')
 
     def run_expiry_once(self, pool: ThreadPoolExecutor):
-        now = now_as_iso()
+        futures: list[Future] = []
+        try:
+            return self._schedule_expiry(pool, futures)
+        finally:
+            # Let this round finish, so the next one doesn't pick up documents that are still being deleted
+            concurrent.futures.wait(futures)
+
+    def _schedule_expiry(self, pool: ThreadPoolExecutor, futures: list[Future]) -> bool:
+        # The end of the expiry window is the same for every collection in this round
+        final_date = dm(self.final_date_template.format(now=now_as_iso())).float_timestamp
         reached_max = False
 
         # Delete canceled submissions
@@ -191,7 +209,7 @@ class ExpiryManager(ServerBase):
                 "to_be_deleted:true", fl="sid", rows=max(1, int(self.config.core.expiry.workers / 4)))['items']:
             if submission.sid not in self.current_submission_cleanup:
                 self.current_submission_cleanup.add(submission.sid)
-                pool.submit(self.log_errors(self._cleanup_canceled_submission), submission.sid)
+                futures.append(pool.submit(self.log_errors(self._cleanup_canceled_submission), submission.sid))
 
         # Expire data
         for collection in self.expirable_collections:
@@ -201,19 +219,21 @@ class ExpiryManager(ServerBase):
             if self.apm_client:
                 self.apm_client.begin_transaction("Delete expired documents")
 
-            if self.config.core.expiry.batch_delete:
-                final_date = dm(f"{now}||-{self.config.core.expiry.delay}h/d").float_timestamp
-            else:
-                final_date = dm(f"{now}||-{self.config.core.expiry.delay}h").float_timestamp
-            final_date_string = epoch_to_iso(final_date)
+            # Figure out once if this is an index that needs file cleanup
+            filestore_urls = None
+            if self.config.core.expiry.delete_storage:
+                filestore_urls = self.fs_urls.get(collection.name)
 
-            # Break down the expiry window into smaller chunks of data
-            unchecked_chunks: list[tuple[float, float]] = [(self._find_expiry_start(collection), final_date)]
+            # Break down the expiry window into smaller chunks of data, the size of the
+            # whole window comes for free with the search for its start
+            start, window_size = self._find_expiry_start(collection, final_date)
+            unchecked_chunks: list[tuple[float, float, Optional[int]]] = [(start, final_date, window_size)]
             ready_chunks: dict[tuple[float, float], int] = {}
             while unchecked_chunks and len(ready_chunks) < self.config.core.expiry.iteration_max_tasks:
                 self.heartbeat()
-                start, end = unchecked_chunks.pop()
-                chunk_size = self._count_expired(collection, start, end)
+                start, end, chunk_size = unchecked_chunks.pop()
+                if chunk_size is None:
+                    chunk_size = self._count_expired(collection, start, end)
 
                 # Empty chunks are fine
                 if chunk_size == 0:
@@ -227,8 +247,8 @@ class ExpiryManager(ServerBase):
 
                 # Break this chunk into parts
                 middle = (end + start)/2
-                unchecked_chunks.append((middle, end))
-                unchecked_chunks.append((start, middle))
+                unchecked_chunks.append((middle, end, None))
+                unchecked_chunks.append((start, middle, None))
 
             # If there are still chunks we haven't checked, then we know there is more data
             if unchecked_chunks:
@@ -244,8 +264,7 @@ class ExpiryManager(ServerBase):
                 self.log.info(f"Processing collection: {collection.name}")
                 delete_query = f"expiry_ts:[{epoch_to_iso(start) if start > 0 else '*'} TO {epoch_to_iso(end)}}}"
 
-                # check if we are dealing with an index that needs file cleanup
-                if self.config.core.expiry.delete_storage and collection.name in self.fs_hashmap:
+                if filestore_urls:
                     # Delete associated files
                     delete_objects: list[str] = []
                     for item in collection.stream_search(delete_query, fl='id', as_obj=False):
@@ -259,17 +278,21 @@ class ExpiryManager(ServerBase):
                         delete_objects = [k for k, v in archived_files.items() if not v]
                         expire_only = [k for k, v in archived_files.items() if v]
 
-                    delete_tasks = self.fs_hashmap[collection.name](delete_objects, final_date_string)
+                    # Don't bother the delete workers if every file is only being expired from the datastore
+                    delete_tasks = None
+                    if delete_objects:
+                        delete_tasks = self.storage_delete(filestore_urls, delete_objects)
 
                     # Proceed with deletion, but only after all the scheduled deletes for this
                     self.log.info(f"Scheduled {len(delete_objects)}/{number_to_delete} "
                                   f"files to be removed for: {collection.name}")
-                    pool.submit(self.log_errors(self._finish_delete), collection, delete_tasks, expire_only)
+                    futures.append(pool.submit(self.log_errors(self._finish_delete),
+                                               collection, delete_tasks, expire_only))
 
                 else:
                     # Proceed with deletion
-                    pool.submit(self.log_errors(self._simple_delete),
-                                collection, delete_query, number_to_delete)
+                    futures.append(pool.submit(self.log_errors(self._simple_delete),
+                                               collection, delete_query, number_to_delete))
 
             # End of expiry transaction
             if self.apm_client:
@@ -277,13 +300,13 @@ class ExpiryManager(ServerBase):
 
         return reached_max
 
-    def _find_expiry_start(self, container: ESCollection):
-        """Find earliest expiring item in this container."""
-        rows = container.search(f"expiry_ts: [* TO {epoch_to_iso(time.time())}]",
-                                rows=1, sort='expiry_ts asc', as_obj=False, fl='expiry_ts')
+    def _find_expiry_start(self, container: ESCollection, end: float) -> tuple[float, int]:
+        """Find earliest expiring item in this container and how many items expire before the given end."""
+        rows = container.search(f"expiry_ts:[* TO {epoch_to_iso(end)}}}", rows=1, sort='expiry_ts asc',
+                                as_obj=False, fl='expiry_ts', track_total_hits=self.expiry_size)
         if rows['items']:
-            return iso_to_epoch(rows['items'][0]['expiry_ts'])
-        return time.time()
+            return iso_to_epoch(rows['items'][0]['expiry_ts']), rows['total']
+        return end, 0
 
     def _count_expired(self, container: ESCollection, start: Union[float, str], end: float) -> int:
         """Count how many items need to be erased in the given window."""
@@ -295,22 +318,22 @@ class ExpiryManager(ServerBase):
         return container.search(query, rows=0, as_obj=False, track_total_hits=self.expiry_size)['total']
 
     def try_run(self):
-        while self.running:
-            try:
-                expiry_maxed_out = False
+        with ThreadPoolExecutor(self.config.core.expiry.workers, thread_name_prefix='expiry') as pool:
+            while self.running:
+                try:
+                    expiry_maxed_out = False
 
-                with ThreadPoolExecutor(self.config.core.expiry.workers) as pool:
                     try:
                         expiry_maxed_out = self.run_expiry_once(pool)
                     except Exception as e:
                         self.log.exception(str(e))
 
-                if not expiry_maxed_out:
-                    self.sleep_with_heartbeat(self.config.core.expiry.sleep_time)
+                    if not expiry_maxed_out:
+                        self.sleep_with_heartbeat(self.config.core.expiry.sleep_time)
 
-            except BrokenProcessPool:
-                self.log.error("File delete worker pool crashed.")
-                self.file_delete_worker = ProcessPoolExecutor(self.config.core.expiry.delete_workers)
+                except BrokenProcessPool:
+                    self.log.error("File delete worker pool crashed.")
+                    self.file_delete_worker = ProcessPoolExecutor(self.config.core.expiry.delete_workers)
 
 
 if __name__ == "__main__":
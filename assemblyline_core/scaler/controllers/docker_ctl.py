@@ -8,7 +8,7 @@ from typing import List, Optional, Tuple, Dict
 import uuid
 
 from assemblyline.odm.models.service import DependencyConfig, DockerConfig
-from .interface import ControllerInterface, ServiceControlError
+from .interface import ControllerInterface, ServiceControlError, config_hash
 
 # Where to find the update directory inside this container.
 INHERITED_VARIABLES = ['HTTP_PROXY', 'HTTPS_PROXY', 'NO_PROXY', 'http_proxy', 'https_proxy', 'no_proxy']
@@ -415,7 +415,7 @@ class DockerController(ControllerInterface):
         import docker.errors
         deployment_name = f'{self._prefix}{service_name.lower()}_{container_name.lower()}'
 
-        change_check = str(hash(f"{change_key}sn={service_name}cn={container_name}spc={spec}"))
+        change_check = config_hash(f"{change_key}sn={service_name}cn={container_name}spc={spec}")
         instance_key = None
 
         try:
@@ -444,7 +444,7 @@ class DockerController(ControllerInterface):
         deployment_name = f'{self._prefix}{service_name.lower()}_{container_name.lower()}'
         self.log.info("Killing stale container...")
 
-        change_check = str(hash(f"{change_key}sn={service_name}cn={container_name}spc={spec}"))
+        change_check = config_hash(f"{change_key}sn={service_name}cn={container_name}spc={spec}")
         instance_key = None
 
         try:
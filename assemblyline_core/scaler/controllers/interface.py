@@ -1,10 +1,54 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING, Optional
+import hashlib
+import struct
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Optional
 
 if TYPE_CHECKING:
     from assemblyline_core.scaler.scaler_server import ServiceProfile
 
 
+def _feed_config(digest, value: Any):
+    """Write a type tagged, length prefixed encoding of the value into the digest."""
+    if isinstance(value, Mapping):
+        digest.update(b'd' + struct.pack('>Q', len(value)))
+        for key in sorted(value, key=str):
+            _feed_config(digest, key)
+            _feed_config(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'l' + struct.pack('>Q', len(value)))
+        for item in value:
+            _feed_config(digest, item)
+    elif isinstance(value, (set, frozenset)):
+        # Set iteration order isn't stable across processes, order the members by their own digests
+        digest.update(b'e' + struct.pack('>Q', len(value)))
+        for member in sorted(config_hash(item) for item in value):
+            digest.update(member.encode())
+    elif value is None:
+        digest.update(b'n')
+    elif isinstance(value, bool):
+        digest.update(b't' if value else b'f')
+    elif isinstance(value, float):
+        digest.update(b'r' + struct.pack('>d', value))
+    elif isinstance(value, (str, bytes, int)):
+        tag = b'b' if isinstance(value, bytes) else b'i' if isinstance(value, int) else b's'
+        data = value if isinstance(value, bytes) else str(value).encode()
+        digest.update(tag + struct.pack('>Q', len(data)) + data)
+    else:
+        raise TypeError(f"Can't build a stable hash for values of type {type(value).__name__}")
+
+
+def config_hash(data: Any) -> str:
+    """Digest of a (nested) configuration that is stable across processes.
+
+    Used for the change keys stored on containers and deployments, which are compared
+    against by later scaler instances, so the builtin (randomized) hash can't be used.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _feed_config(digest, data)
+    return digest.hexdigest()
+
+
 class ServiceControlError(RuntimeError):
     def __init__(self, message, service_name):
         super().__init__(message)
@@ -25,7 +25,7 @@ from kubernetes.client import V1Deployment, V1DeploymentSpec, V1PodTemplateSpec,
 from kubernetes.client.rest import ApiException
 from assemblyline.odm.models.service import DependencyConfig, DockerConfig, PersistentVolume
 
-from assemblyline_core.scaler.controllers.interface import ControllerInterface
+from assemblyline_core.scaler.controllers.interface import ControllerInterface, config_hash
 
 # RESERVE_MEMORY_PER_NODE = os.environ.get('RESERVE_MEMORY_PER_NODE')
 
@@ -732,7 +732,7 @@ class KubernetesController(ControllerInterface):
                          f"l={lbls}v={volumes}m={mounts}cm={core_mounts}senv={svc_env}"
                          f"nodes={field_selector or ''}{label_selector or ''}")
         self.logger.debug(f"{deployment_name} actual change_key: {change_key}")
-        change_key = str(hash(change_key))
+        change_key = config_hash(change_key)
 
         # Check if a deployment already exists, and if it does check if it has the same change key set
         replace = None
@@ -996,7 +996,7 @@ class KubernetesController(ControllerInterface):
                          f"l={labels}v={volumes}m={mounts}cm={True}senv={senv}")
 
         self.logger.debug(f"{deployment_name} expected change_key: {change_key}")
-        if old_deployment.metadata.annotations.get(CHANGE_KEY_NAME) != str(hash(change_key)):
+        if old_deployment.metadata.annotations.get(CHANGE_KEY_NAME) != config_hash(change_key):
             # A change occurred, declare dependency not ready yet.
             return
 
@@ -29,13 +29,12 @@ from assemblyline.odm.models.config import Mount
 from assemblyline.odm.messages.scaler_heartbeat import Metrics
 from assemblyline.odm.messages.scaler_status_heartbeat import Status
 from assemblyline.odm.messages.changes import ServiceChange, Operation
-from assemblyline.common.dict_utils import get_recursive_sorted_tuples
 from assemblyline.common.uid import get_id_from_data
 from assemblyline.common.forge import get_classification, get_service_queue, get_apm_client
 from assemblyline.common.constants import SCALER_TIMEOUT_QUEUE, SERVICE_STATE_HASH, ServiceStatus
 from assemblyline.common.version import FRAMEWORK_VERSION, SYSTEM_VERSION
 from assemblyline_core.scaler.controllers import KubernetesController
-from assemblyline_core.scaler.controllers.interface import ServiceControlError
+from assemblyline_core.scaler.controllers.interface import ServiceControlError, config_hash
 from assemblyline_core.server_base import ServiceStage, ThreadedCoreBase
 
 from .controllers import DockerController
@@ -586,7 +585,7 @@ class ScalerServer(ThreadedCoreBase):
 
                 # Compute a blob of service properties not include in the docker config, that
                 # should still result in a service being restarted when changed
-                cfg_items = get_recursive_sorted_tuples(service.config)
+                cfg_items = config_hash(service.config)
                 dep_keys = ''.join(sorted(dependency_keys.values()))
                 config_blob = (f"c={cfg_items}sp={service.submission_params}"
                                f"dk={dep_keys}p={service.privileged}d={docker_config}ssl={INTERNAL_ENCRYPT}")
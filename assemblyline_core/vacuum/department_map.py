@@ -26,17 +26,19 @@ class DepartmentMap:
         self.init_data = init
         self.lock = threading.Lock()
         self.table = RangeTable()
-        self.update_time = 0
+        # Monotonic deadlines, before which we don't reload or refresh the table
+        self.reload_after = 0.0
+        self.refresh_after = 0.0
         self._load_department_map()
 
     def _load_department_map(self):
         # Don't load more than once every 5 seconds
-        if time.time() - self.update_time < 5:
+        if time.monotonic() < self.reload_after:
             return
 
         with self.lock:
             # Recheck in case it was updated while waiting for lock
-            if time.time() - self.update_time < 5:
+            if time.monotonic() < self.reload_after:
                 return
 
             table = RangeTable()
@@ -63,10 +65,12 @@ class DepartmentMap:
                 logger.exception("Error parsing department_map_url")
 
             self.table = table
-            self.update_time = time.time()
+            now = time.monotonic()
+            self.reload_after = now + 5
+            self.refresh_after = now + self.UPDATE_INTERVAL
 
     def _refresh_department_map(self):
-        if time.time() - self.update_time > self.UPDATE_INTERVAL:
+        if time.monotonic() >= self.refresh_after:
             self._load_department_map()
 
     def __getitem__(self, ip) -> Optional[str]:
@@ -33,17 +33,19 @@ class StreamMap:
         self.init_data = init
         self.lock = threading.Lock()
         self.table: dict[int, Stream] = {}
-        self.update_time = 0
+        # Monotonic deadlines, before which we don't reload or refresh the table
+        self.reload_after = 0.0
+        self.refresh_after = 0.0
         self._load_stream_map()
 
     def _load_stream_map(self):
         # Don't load more than once every 5 seconds
-        if time.time() - self.update_time < 5:
+        if time.monotonic() < self.reload_after:
             return
 
         with self.lock:
             # Recheck in case it was updated while waiting for lock
-            if time.time() - self.update_time < 5:
+            if time.monotonic() < self.reload_after:
                 return
 
             table = {}
@@ -80,10 +82,12 @@ class StreamMap:
                 logger.exception("Error parsing stream_map_url data")
 
             self.table = table
-            self.update_time = time.time()
+            now = time.monotonic()
+            self.reload_after = now + 5
+            self.refresh_after = now + self.UPDATE_INTERVAL
 
     def _refresh_stream_map(self):
-        if time.time() - self.update_time > self.UPDATE_INTERVAL:
+        if time.monotonic() >= self.refresh_after:
             self._load_stream_map()
 
     def __getitem__(self, stream_id: int) -> Optional[Stream]:
@@ -147,8 +147,8 @@ class FileProcessor(threading.Thread):
 
     profile_lock = threading.RLock()
 
-    profile_check = time.time()
-    settings_check = time.time()
+    profile_check = time.monotonic()
+    settings_check = time.monotonic()
     total_rounds = threading.Semaphore(value=1000)
 
     user_profile: Optional[dict] = None
@@ -199,27 +199,27 @@ class FileProcessor(threading.Thread):
         self.get_user_settings()
 
     def get_user(self) -> dict:
-        if self.user_profile and time.time() - self.profile_check < PROFILE_CACHE_TIME:
+        if self.user_profile and time.monotonic() - self.profile_check < PROFILE_CACHE_TIME:
             return self.user_profile
 
         with self.profile_lock:
-            if self.user_profile and time.time() - self.profile_check < PROFILE_CACHE_TIME:
+            if self.user_profile and time.monotonic() - self.profile_check < PROFILE_CACHE_TIME:
                 return self.user_profile
 
             self.user_profile = self.datastore.user.get(self.config.core.vacuum.assemblyline_user, as_obj=False)
-            self.profile_check = time.time()
+            self.profile_check = time.monotonic()
             return self.user_profile
 
     def get_user_settings(self) -> dict:
-        if self.user_settings and time.time() - self.settings_check < PROFILE_CACHE_TIME:
+        if self.user_settings and time.monotonic() - self.settings_check < PROFILE_CACHE_TIME:
             return deepcopy(self.user_settings)
 
         with self.profile_lock:
-            if self.user_settings and time.time() - self.settings_check < PROFILE_CACHE_TIME:
+            if self.user_settings and time.monotonic() - self.settings_check < PROFILE_CACHE_TIME:
                 return deepcopy(self.user_settings)
 
             self.user_settings = self.prepare_settings()
-            self.settings_check = time.time()
+            self.settings_check = time.monotonic()
             return deepcopy(self.user_settings)
 
     def prepare_settings(self) -> dict:
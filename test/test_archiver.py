@@ -0,0 +1,114 @@
+import concurrent.futures
+from types import SimpleNamespace
+from unittest.mock import MagicMock, call
+
+from assemblyline_core.archiver.run_archiver import Archiver
+
+SHA256 = 'a' * 64
+OTHER_SHA256 = 'b' * 64
+
+
+def archiver():
+    # Skip the constructor, only the methods under test need to be exercised
+    archiver = Archiver.__new__(Archiver)
+    archiver.log = MagicMock()
+    archiver.filestore = MagicMock()
+    archiver.archivestore = MagicMock()
+    return archiver
+
+
+def submission_archiver(pools):
+    # An archiver holding a submission with a file, a supplementary file and an error result
+    instance = archiver()
+    instance.config = MagicMock()
+    instance.counter = MagicMock()
+    instance.apm_client = MagicMock()
+    instance.pool, instance.copy_pool = pools
+    instance.archive_queue = MagicMock()
+    instance.archive_queue.pop.return_value = ('submission', 'sid', False)
+    instance.archivestore.exists.return_value = False
+    instance.filestore.get.return_value = b'content'
+
+    instance.datastore = MagicMock()
+    instance.datastore.submission.get_if_exists.return_value = SimpleNamespace(
+        files=[SimpleNamespace(sha256=SHA256)],
+        results=[f'{SHA256}.extract.v1.c0', f'{OTHER_SHA256}.av.v1.c0', f'{OTHER_SHA256}.static.v1.e'],
+    )
+    instance.datastore.get_tag_list_from_keys.return_value = []
+    instance.datastore.get_file_list_from_keys.return_value = {(SHA256, True), (OTHER_SHA256, True)}
+    return instance
+
+
+def supplementary_flags(instance):
+    # Map the files to the is_supplementary value they were updated with
+    flags = {}
+    for args, kwargs in instance.datastore.file.update.call_args_list:
+        for operation in kwargs['operations']:
+            if operation[1] == 'is_supplementary':
+                flags[args[0]] = operation[2]
+    return flags
+
+
+def test_copy_file():
+    instance = archiver()
+    instance.archivestore.exists.return_value = False
+    instance.filestore.get.return_value = b'content'
+
+    instance._copy_file(SHA256)
+    instance.archivestore.put.assert_called_once_with(SHA256, b'content')
+
+
+def test_copy_file_already_in_archivestore():
+    # Content that is already archived isn't downloaded again
+    instance = archiver()
+    instance.archivestore.exists.return_value = True
+
+    instance._copy_file(SHA256)
+    instance.filestore.get.assert_not_called()
+    instance.archivestore.put.assert_not_called()
+
+
+def test_copy_file_missing_from_filestore():
+    instance = archiver()
+    instance.archivestore.exists.return_value = False
+    instance.filestore.get.return_value = None
+
+    instance._copy_file(SHA256)
+    instance.archivestore.put.assert_not_called()
+    instance.log.error.assert_called_once()
+
+
+def test_run_once():
+    with concurrent.futures.ThreadPoolExecutor(4) as pool, concurrent.futures.ThreadPoolExecutor(2) as copy_pool:
+        instance = submission_archiver((pool, copy_pool))
+        instance.run_once()
+
+    # Every file is archived and labelled once, the submission file isn't supplementary even if a result says so
+    assert sorted(c.args[0] for c in instance.datastore.file.archive.call_args_list) == [SHA256, OTHER_SHA256]
+    assert supplementary_flags(instance) == {SHA256: False, OTHER_SHA256: True}
+    assert instance.datastore.file.update.call_count == 4
+
+    # Every file content is copied, error results are skipped
+    assert sorted(c.args for c in instance.archivestore.put.call_args_list) == \
+        [(SHA256, b'content'), (OTHER_SHA256, b'content')]
+    assert sorted(c.args[0] for c in instance.datastore.result.archive.call_args_list) == \
+        [f'{SHA256}.extract.v1.c0', f'{OTHER_SHA256}.av.v1.c0']
+    instance.apm_client.end_transaction.assert_called_once_with('submission', 'success')
+
+
+def test_run_once_failing_file():
+    def archive(sha256, **_):
+        if sha256 == SHA256:
+            raise ValueError(sha256)
+
+    with concurrent.futures.ThreadPoolExecutor(4) as pool, concurrent.futures.ThreadPoolExecutor(2) as copy_pool:
+        instance = submission_archiver((pool, copy_pool))
+        instance.datastore.file.archive.side_effect = archive
+        instance.run_once()
+
+    # The failure is reported once all the other tasks of the submission are done
+    assert supplementary_flags(instance) == {OTHER_SHA256: True}
+    assert instance.archivestore.put.call_count == 2
+    assert instance.datastore.result.archive.call_count == 2
+    assert call('exception') in instance.counter.increment.call_args_list
+    instance.apm_client.end_transaction.assert_called_once_with('submission', 'exception')
@@ -1,4 +1,5 @@
 
+import logging
 import pytest
 import random
 import concurrent.futures
@@ -6,7 +7,7 @@ import concurrent.futures
 from assemblyline.common.isotime import now_as_iso
 from assemblyline.odm.randomizer import random_model_obj
 
-from assemblyline_core.expiry.run_expiry import ExpiryManager
+from assemblyline_core.expiry.run_expiry import ExpiryManager, FILE_DELETE_CHUNK_SIZE, _file_delete_worker
 
 MAX_OBJECTS = 10
 MIN_OBJECTS = 2
@@ -70,3 +71,23 @@ def test_expire_all(ds_expiry):
         collection = getattr(ds_expiry, k)
         collection.commit()
         assert collection.search("id:*")['total'] == 0
+
+
+def test_file_delete_worker_chunks():
+    file_batch = [f'file_{x}' for x in range(FILE_DELETE_CHUNK_SIZE * 3 + 5)]
+    chunks = []
+
+    def delete_action(chunk):
+        chunks.append(chunk)
+        if 'file_0' in chunk:
+            raise ValueError("failed chunk")
+        return chunk
+
+    erased = _file_delete_worker(logging.getLogger('test'), delete_action, file_batch)
+
+    # The batch is split into bounded chunks that cover every file exactly once
+    assert all(0 < len(chunk) <= FILE_DELETE_CHUNK_SIZE for chunk in chunks)
+    assert sorted(sum(chunks, [])) == sorted(file_batch)
+
+    # Results from every chunk but the failing one are merged
+    assert sorted(erased) == sorted(file_batch[FILE_DELETE_CHUNK_SIZE:])
@@ -1,7 +1,9 @@
 from assemblyline.odm.models.service import DockerConfig
+import pytest
 from pytest import approx
 from unittest.mock import Mock, patch
 from assemblyline_core.scaler.collection import Collection
+from assemblyline_core.scaler.controllers.interface import config_hash
 from assemblyline_core.scaler.scaler_server import ServiceProfile
 
 mock_time = Mock()
@@ -51,3 +53,17 @@ def test_default_bucket_rates():
     service.update(5, 1, 1, 1)
     print(service.pressure, before)
     assert service.pressure > before
+
+
+def test_config_hash():
+    # Key order doesn't matter, but values and their types do
+    assert config_hash({'a': [1, {'b': None}], 'c': 1.5}) == config_hash({'c': 1.5, 'a': [1, {'b': None}]})
+    assert config_hash({'a': 1}) != config_hash({'a': '1'})
+    assert config_hash({'a': [1, 2]}) != config_hash({'a': [2, 1]})
+    assert config_hash('') == '3299dc3d5be4287be154be13ee163ecd'
+
+    # Sets hash the same whatever order they iterate in, other types are refused
+    assert config_hash({'a': {'x', 'y', 'z'}}) == config_hash({'a': {'z', 'y', 'x'}})
+    assert config_hash({'x', 'y'}) != config_hash(['x', 'y'])
+    with pytest.raises(TypeError):
+        config_hash({'a': object()})
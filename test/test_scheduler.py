@@ -6,6 +6,7 @@ from assemblyline.odm.models.service import Service
 from assemblyline.odm.randomizer import random_model_obj
 
 from assemblyline_core.dispatching.dispatcher import Scheduler
+from assemblyline_core.dispatching.schedules import compile_service_filters
 from assemblyline_core.server_base import get_service_stage_hash, ServiceStage
 
 
@@ -151,3 +152,66 @@ def test_schedule_service_safelist(scheduler):
     schedule = scheduler.build_schedule(sub, 'document/word', file_depth=1)
     for a, b in zip(schedule, [["Safelist"], [], []]):
         assert set(a) == set(b)
+
+
+def test_compile_service_filters():
+    # Trivial accept patterns and missing rejects skip the regex entirely
+    assert compile_service_filters(dummy_service('a', 'pre', accepts='.*')) == (None, None)
+    assert compile_service_filters(dummy_service('a', 'pre', accepts='')) == (None, None)
+
+    accepts, rejects = compile_service_filters(dummy_service('a', 'pre', accepts='archive/.*', rejects='.*'))
+    assert accepts.match('archive/zip') and not accepts.match('document/word')
+    assert rejects.match('archive/zip')
+
+
+def test_expand_categories(scheduler):
+    # Categories listed more than once are only expanded once, services are never duplicated
+    expanded = scheduler.expand_categories(['static', 'av', 'static', 'AnAV', 'cuckoo'])
+    assert sorted(expanded) == sorted(['extract', 'polish', 'not_documents', 'Safelist', 'AnAV', 'cuckoo'])
+    assert scheduler.expand_categories(None) == []
+
+
+def test_scheduler_with_own_services():
+    # Schedulers that provide their own services still get categories and stages derived from them
+    class OwnServices(Scheduler):
+        def __init__(self):
+            self.config = Config(DEFAULT_CONFIG)
+            self.config.services.stages = ['pre', 'core', 'post']
+
+        @property
+        def services(self):
+            return {service.name: service for service in FakeDatastore().list_all_services()}
+
+    scheduler = OwnServices()
+    assert sorted(scheduler.expand_categories(['static', 'dynamic'])) == \
+        sorted(['extract', 'polish', 'not_documents', 'Safelist', 'cuckoo'])
+    assert scheduler.stage_index('core') == 1
+
+
+def test_expand_nested_categories():
+    # Categories can name other categories, even circularly, each one is expanded a single time
+    class CountingCategories(dict):
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.expanded = []
+
+        def __getitem__(self, name):
+            assert name not in self.expanded, f"category {name} expanded twice"
+            self.expanded.append(name)
+            return super().__getitem__(name)
+
+    categories = CountingCategories({
+        'static': ['dynamic', 'extract'],
+        'dynamic': ['static', 'cuckoo'],
+    })
+
+    class NestedCategories(Scheduler):
+        def __init__(self):
+            pass
+
+        def categories(self):
+            return categories
+
+    expanded = NestedCategories().expand_categories(['static', 'AnAV'])
+    assert sorted(expanded) == ['AnAV', 'cuckoo', 'extract']
+    assert sorted(categories.expanded) == ['dynamic', 'static']